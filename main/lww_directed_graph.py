@@ -1,5 +1,6 @@
 import time
-from threading import RLock
+from collections import deque
+from threading import Lock
 
 
 class Graph:
@@ -14,7 +15,10 @@ class Graph:
         self.vertices_removed_set = {}
         self.edges_added_set = {}
         self.edges_removed_set = {}
-        self.lock = RLock()
+        self.incoming_edges = {}
+        self.connected_vertices_cache = {}
+        self.last_timestamp = 0
+        self.lock = Lock()
 
     def addVertex(self, vertex, timestamp=None):
         """
@@ -26,14 +30,13 @@ class Graph:
         """
 
         with self.lock:
-            timestamp = timestamp if timestamp else self._generateTimestamp()
-            self.vertices_added_set[vertex] = timestamp
+            self._addVertexNoLock(vertex, timestamp)
 
     def addEdge(self, frm, to):
         """
         Add an edge to the graph with current epoch time. If the edge already exists,
-        its timestamp is updated. If vertices referenced by the edge do not exists, the addVertex
-        method is called and the vertex is added to the graph.
+        its timestamp is updated. If vertices referenced by the edge do not exists, the vertex is
+        added to the graph with the same timestamp as the edge.
 
         :param frm: vertex the connection originates from
         :param to: vertex the connection points to
@@ -42,23 +45,27 @@ class Graph:
         with self.lock:
             timestamp = self._generateTimestamp()
 
-            if not self.lookupVertexExists(to):
-                self.addVertex(to, timestamp)
+            added = self.vertices_added_set
+            removed = self.vertices_removed_set
 
-            if not self.lookupVertexExists(frm):
-                self.addVertex(frm, timestamp)
+            # adds the vertices referenced by the edge which do not exist in the graph
+            if to not in added or (to in removed and added[to] < removed[to]):
+                added[to] = timestamp
 
-            if self.edges_added_set.get(frm):
-                self.edges_added_set[frm][to] = timestamp
-            else:
-                self.edges_added_set[frm] = {to: timestamp}
+            if frm not in added or (frm in removed and added[frm] < removed[frm]):
+                added[frm] = timestamp
+
+            self.edges_added_set.setdefault(frm, {})[to] = timestamp
+            self.connected_vertices_cache.pop(frm, None)
+
+            self._indexIncomingEdge(frm, to)
 
     def removeVertex(self, vertex):
         """
         Remove vertex from the graph by adding it to the vertices_removed_set with timestamp.
-        Where the removed vertex is referenced by an edge, regardless of direction, the removeEdge
-        method is called and the edge is added to the edges_removed_set with the same timestamp
-        as the removed vertex.
+        Where the removed vertex is referenced by an edge, regardless of direction, the edge is added
+        to the edges_removed_set with the same timestamp as the removed vertex. Edges pointing to the
+        vertex are found through the incoming_edges index.
 
         :param vertex: vertex to be removed
         """
@@ -68,17 +75,14 @@ class Graph:
 
             self.vertices_removed_set[vertex] = timestamp
 
-            connected_vertices = list(self.edges_added_set.get(vertex, {}).keys())
-
             # deletes edges originating from removed vertex
-            for connection in connected_vertices:
-                self.removeEdge(vertex, connection, timestamp)
+            for connection in self.edges_added_set.get(vertex, ()):
+                self._removeEdgeNoLock(vertex, connection, timestamp)
 
             # deletes edges pointing to removed vertex
-            for connection in self.edges_added_set.keys():
+            for connection in self.incoming_edges.get(vertex, ()):
                 if connection != vertex:
-                    if vertex in self.edges_added_set[connection].keys():
-                        self.removeEdge(connection, vertex, timestamp)
+                    self._removeEdgeNoLock(connection, vertex, timestamp)
 
     def removeEdge(self, frm, to, timestamp=None):
         """
@@ -92,12 +96,7 @@ class Graph:
         """
 
         with self.lock:
-            timestamp = timestamp if timestamp else self._generateTimestamp()
-
-            if self.edges_removed_set.get(frm):
-                self.edges_removed_set[frm][to] = timestamp
-            else:
-                self.edges_removed_set[frm] = {to: timestamp}
+            self._removeEdgeNoLock(frm, to, timestamp)
 
     def lookupVertexExists(self, vertex):
         """
@@ -111,13 +110,12 @@ class Graph:
         :return: True is the vertex exists, False if not
         """
 
-        if vertex in self.vertices_added_set.keys() and (
-            vertex not in self.vertices_removed_set.keys()
-            or self.vertices_added_set[vertex] >= self.vertices_removed_set[vertex]
-        ):
-            return True
-        else:
-            return False
+        added = self.vertices_added_set
+        removed = self.vertices_removed_set
+
+        return vertex in added and (
+            vertex not in removed or added[vertex] >= removed[vertex]
+        )
 
     def lookupConnectedVertices(self, vertex):
         """
@@ -127,7 +125,30 @@ class Graph:
         in the edges_added_set.
         Favouring the edges_added_set if added and removed operations were concurrent and
         they hold the same timestamp value.
+        The connected vertices are cached in the connected_vertices_cache until an edge originating from
+        the vertex is added, removed or merged.
+
+
+        :param vertex: vertex connections need to be looked up for
+        :return: list of all connected vertices, empty list if vertex has no connected vertices
+        """
+
+        connected_vertices = self.connected_vertices_cache.get(vertex)
 
+        if connected_vertices is None:
+            if vertex not in self.edges_added_set:
+                return []
+
+            with self.lock:
+                connected_vertices = self._connectedVerticesNoLock(vertex)
+                self.connected_vertices_cache[vertex] = connected_vertices
+
+        return list(connected_vertices)
+
+    def _connectedVerticesNoLock(self, vertex):
+        """
+        Reconcile the edges_added_set and edges_removed_set of a vertex into its connected vertices,
+        see lookupConnectedVertices. Callers must hold the lock.
 
         :param vertex: vertex connections need to be looked up for
         :return: list of all connected vertices, empty list if vertex has no connected vertices
@@ -139,51 +160,78 @@ class Graph:
         if added_connections is None:
             return []
         elif removed_connections is None:
-            return list(added_connections.keys())
+            return list(added_connections)
         else:
-            connected = []
+            return [
+                connection
+                for connection, timestamp in added_connections.items()
+                if connection not in removed_connections
+                or removed_connections[connection] <= timestamp
+            ]
+
+    def findPaths(self, vertex1, vertex2):
+        """
+        Find all possible paths between two vertices. The connections of the vertices reachable from vertex1
+        are looked up once into an integer encoded adjacency (see _buildAdjacency) and the paths are searched
+        on that snapshot. If vertex2 is not reachable, no search is made.
+        The number of paths can grow exponentially with the size of the graph; use findAnyPath when a
+        single path is sufficient.
+
+        :param vertex1: vertex for starting point of the path
+        :param vertex2: vertex for ending point of the path
+        :return: list of lists, where each sublist is considered a possible path between vertex1 and vertex2
+        """
+
+        if vertex1 == vertex2:
+            return [[vertex1]]
 
-            removed_connection_vertices = list(removed_connections.keys())
+        vertices, vertex_ids, indptr, indices = self._buildAdjacency(vertex1)
 
-            for connection in added_connections.keys():
-                if (
-                    connection not in removed_connection_vertices
-                    or removed_connections[connection] <= added_connections[connection]
-                ):
-                    connected.append(connection)
+        if vertex2 not in vertex_ids:
+            return []
+
+        paths = self._findPathIds(
+            indptr, indices, vertex_ids[vertex1], vertex_ids[vertex2]
+        )
 
-            return connected
+        return [[vertices[vertex_id] for vertex_id in path] for path in paths]
 
-    def findPaths(self, vertex1, vertex2, path=[]):
+    def findAnyPath(self, vertex1, vertex2):
         """
-        Find all possible paths between two vertices.
+        Find a path between two vertices with the fewest edges. Breadth-first search, which stops as soon
+        as vertex2 is reached and looks up the connections of each vertex at most once.
 
         :param vertex1: vertex for starting point of the path
         :param vertex2: vertex for ending point of the path
-        :param path: list of vertices to build a path
-        :return: list of lists, where each sublist is considered a possible path between vertex1 and vertex2
+        :return: list of vertices on the path, empty list if there is no path between vertex1 and vertex2
         """
 
-        path = path + [vertex1]
-
         if vertex1 == vertex2:
-            return [path]
+            return [vertex1]
 
-        connected_vertices = self.lookupConnectedVertices(vertex1)
+        parents = {vertex1: None}
+        queue = deque([vertex1])
 
-        paths = []
+        while queue:
+            vertex = queue.popleft()
 
-        for vertex in connected_vertices:
-            if vertex not in path:
-                newpaths = self.findPaths(vertex, vertex2, path)
+            for connection in self.lookupConnectedVertices(vertex):
+                if connection in parents:
+                    continue
 
-            try:
-                for newpath in newpaths:
-                    paths.append(newpath)
-            except NameError:
-                continue
+                parents[connection] = vertex
 
-        return paths
+                if connection == vertex2:
+                    path = [connection]
+
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+
+                    return path[::-1]
+
+                queue.append(connection)
+
+        return []
 
     def merge(
         self,
@@ -193,9 +241,12 @@ class Graph:
         received_edges_removed_set,
     ):
         """
-        Update local graph by merging it with the state of a replica. Calls _mergeVertices and _mergeEdges methods
-        to merge the replica's vertices_added_set, vertices_removed_set, edges_added_set and edges_removed_set
-        into the local representation of these sets.
+        Update local graph by merging it with the state of a replica. The replica's sets are first scanned
+        without holding the lock, keeping only the vertices and edges that are new or have a greater timestamp
+        than in the local graph. Then, holding the lock, _mergeVertices and _mergeEdges methods merge these
+        into the local vertices_added_set, vertices_removed_set, edges_added_set and edges_removed_set.
+        As merging keeps the greatest timestamp, local operations made while the replica's sets are scanned
+        are never lost: the merge re-checks each timestamp once the lock is held.
 
         :param received_vertices_added_set: vertices_added_set of the replica
         :param received_vertices_removed_set: vertices_removed_set of the replica
@@ -203,82 +254,223 @@ class Graph:
         :param received_edges_removed_set: edges_removed_set of the replica
         """
 
+        vertices_added = self._newerVertices(
+            self.vertices_added_set, received_vertices_added_set
+        )
+        vertices_removed = self._newerVertices(
+            self.vertices_removed_set, received_vertices_removed_set
+        )
+        edges_added = self._newerEdges(self.edges_added_set, received_edges_added_set)
+        edges_removed = self._newerEdges(
+            self.edges_removed_set, received_edges_removed_set
+        )
+
         with self.lock:
-            self.vertices_added_set = self._mergeVertices(
-                self.vertices_added_set, received_vertices_added_set
-            )
-            self.vertices_removed_set = self._mergeVertices(
-                self.vertices_removed_set, received_vertices_removed_set
-            )
-
-            self.edges_added_set = self._mergeEdges(
-                self.edges_added_set, received_edges_added_set
-            )
-            self.edges_removed_set = self._mergeEdges(
-                self.edges_removed_set, received_edges_removed_set
-            )
+            self._mergeVertices(self.vertices_added_set, vertices_added)
+            self._mergeVertices(self.vertices_removed_set, vertices_removed)
 
-    def _mergeVertices(self, local_set, received_set):
+            self._mergeEdges(self.edges_added_set, edges_added)
+            for frm, connections in edges_added.items():
+                for to in connections:
+                    self._indexIncomingEdge(frm, to)
+
+            self._mergeEdges(self.edges_removed_set, edges_removed)
+
+            for vertex in edges_added.keys() | edges_removed.keys():
+                self.connected_vertices_cache.pop(vertex, None)
+
+    def _newerVertices(self, local_set, received_set):
         """
-        Merge two sets of vertices, by appending any new vertices present in the replica's graph to the
-        local graph. If the vertex is present in both the local and replica graphs and its timestamp is
-        greater in the replica graph, then the vertex in the local graph is updated with timestamp from
-        the replica graph.
+        Select the vertices present in the replica's graph which are not present in the local graph,
+        or are present with a lesser timestamp.
 
         :param local_set: vertices in the local graph
         :param received_set: vertices from the replica graph
-        :return: merged set of vertices
+        :return: dictionary of the selected vertices and their timestamps in the replica graph
+        """
+
+        return {
+            vertex: timestamp
+            for vertex, timestamp in received_set.items()
+            if vertex not in local_set or timestamp > local_set[vertex]
+        }
+
+    def _newerEdges(self, local_set, received_set):
+        """
+        Select the edges present in the replica's graph which are not present in the local graph,
+        or are present with a lesser timestamp. The selected edges are held in new dictionaries,
+        so they do not share state with the replica.
+
+        :param local_set: edges in the local graph
+        :param received_set: edges in the replica graph
+        :return: dictionary of the selected edges, in the same layout as the sets of edges
         """
 
-        latest_vertices_set = local_set.copy()
+        newer_edges = {}
+
+        for vertex, received_edges in received_set.items():
+            local_edges = local_set.get(vertex, {})
 
-        overlapping_vertices = local_set.keys() & received_set.keys()
+            edges = {
+                edge: timestamp
+                for edge, timestamp in received_edges.items()
+                if edge not in local_edges or timestamp > local_edges[edge]
+            }
 
-        for vertex in overlapping_vertices:
-            if received_set[vertex] > local_set[vertex]:
-                latest_vertices_set[vertex] = received_set[vertex]
+            if edges:
+                newer_edges[vertex] = edges
 
-        for vertex in received_set.keys() - overlapping_vertices:
-            latest_vertices_set[vertex] = received_set[vertex]
+        return newer_edges
 
-        return latest_vertices_set
+    def _mergeVertices(self, local_set, received_set):
+        """
+        Merge vertices selected by _newerVertices into the local set of vertices in place. The local graph
+        may have changed since the selection was made, so a vertex is only updated if its selected timestamp
+        is still greater than the local one.
+
+        :param local_set: vertices in the local graph, updated with the merged set of vertices
+        :param received_set: vertices selected from the replica graph
+        """
+
+        for vertex, timestamp in received_set.items():
+            if vertex not in local_set or timestamp > local_set[vertex]:
+                local_set[vertex] = timestamp
 
     def _mergeEdges(self, local_set, received_set):
         """
-        Merge two sets of edges, by appending any new edges present in the replica's graph to the
-        local graph. If the edge is present in both the local and the replica graphs and the edge's
-        timestamp is greater in the replica graph, then the edge in the local graph is updated with
-        the timestamp from the replica graph.
+        Merge edges selected by _newerEdges into the local set of edges in place. The local graph may have
+        changed since the selection was made, so an edge is only updated if its selected timestamp is still
+        greater than the local one.
 
-        :param local_set: edges in the local graph
-        :param received_set: edges in the replica graph
-        :return: merged set of edges
+        :param local_set: edges in the local graph, updated with the merged set of edges
+        :param received_set: edges selected from the replica graph
+        """
+
+        for vertex, edges in received_set.items():
+            local_edges = local_set.get(vertex)
+
+            # selected edges are held in new dictionaries, so they can be used as they are
+            if local_edges is None:
+                local_set[vertex] = edges
+                continue
+
+            for edge, timestamp in edges.items():
+                if edge not in local_edges or timestamp > local_edges[edge]:
+                    local_edges[edge] = timestamp
+
+    def _buildAdjacency(self, vertex):
+        """
+        Build a snapshot of the connections reachable from a vertex in compressed sparse row form.
+        Vertices get integer ids in the order they are reached, starting with 0 for the given vertex,
+        and the ids of the vertices connected to vertex id i are indices[indptr[i]:indptr[i + 1]].
+        The connections of each reachable vertex are looked up exactly once.
+
+        :param vertex: vertex the snapshot starts from
+        :return: tuple of the vertices indexed by id, dictionary mapping vertices to ids, indptr and indices
+        """
+
+        vertices = [vertex]
+        vertex_ids = {vertex: 0}
+        indptr = [0]
+        indices = []
+
+        # vertices reached while building a row are appended and get their own row later in the loop
+        for current in vertices:
+            for connection in self.lookupConnectedVertices(current):
+                if connection not in vertex_ids:
+                    vertex_ids[connection] = len(vertices)
+                    vertices.append(connection)
+
+                indices.append(vertex_ids[connection])
+
+            indptr.append(len(indices))
+
+        return vertices, vertex_ids, indptr, indices
+
+    def _findPathIds(self, indptr, indices, start_id, target_id):
+        """
+        Depth-first search for all paths between two vertex ids of the adjacency built by _buildAdjacency.
+        The search keeps an explicit stack of connection iterators, so the current path is extended and
+        shortened in place, and a bytearray flagging the vertex ids on the path is used to avoid cycles.
+
+        :param indptr: offsets of each vertex's connections in indices
+        :param indices: ids of connected vertices
+        :param start_id: id of the vertex for starting point of the path
+        :param target_id: id of the vertex for ending point of the path
+        :return: list of lists, where each sublist holds the vertex ids of a path
+        """
+
+        paths = []
+        path = [start_id]
+        visited = bytearray(len(indptr) - 1)
+        visited[start_id] = 1
+        stack = [iter(indices[indptr[start_id] : indptr[start_id + 1]])]
+
+        while stack:
+            connection = next(stack[-1], None)
+
+            if connection is None:
+                stack.pop()
+                visited[path.pop()] = 0
+            elif connection == target_id:
+                paths.append(path + [connection])
+            elif not visited[connection]:
+                path.append(connection)
+                visited[connection] = 1
+                stack.append(iter(indices[indptr[connection] : indptr[connection + 1]]))
+
+        return paths
+
+    def _addVertexNoLock(self, vertex, timestamp=None):
+        """
+        Add a vertex to the vertices_added_set without acquiring the lock. Callers must hold the lock.
+
+        :param vertex: vertex to be added
+        :param timestamp: timestamp for the operation. Default is None
+        """
+
+        timestamp = timestamp if timestamp else self._generateTimestamp()
+        self.vertices_added_set[vertex] = timestamp
+
+    def _removeEdgeNoLock(self, frm, to, timestamp=None):
         """
+        Add an edge to the edges_removed_set without acquiring the lock. Callers must hold the lock.
 
-        latest_edges_set = local_set.copy()
+        :param frm: vertex the connection originates from
+        :param to: vertex the connection points to
+        :param timestamp: timestamp for the operation. Default is None
+        """
+
+        timestamp = timestamp if timestamp else self._generateTimestamp()
 
-        overlapping_vertices = local_set.keys() & received_set.keys()
+        self.edges_removed_set.setdefault(frm, {})[to] = timestamp
+        self.connected_vertices_cache.pop(frm, None)
 
-        for vertex in overlapping_vertices:
-            for edge in latest_edges_set[vertex].keys():
-                if (
-                    edge in latest_edges_set[vertex].keys()
-                    and received_set[vertex][edge] > local_set[vertex][edge]
-                ):
-                    latest_edges_set[vertex][edge] = received_set[vertex][edge]
-                elif edge not in latest_edges_set[vertex].keys():
-                    latest_edges_set[vertex][edge] = received_set[vertex][edge]
+    def _indexIncomingEdge(self, frm, to):
+        """
+        Record an added edge in the incoming_edges reverse index, so edges pointing to a vertex can be
+        found without scanning the edges_added_set.
 
-        for vertex in received_set.keys() - overlapping_vertices:
-            latest_edges_set[vertex] = received_set[vertex]
+        :param frm: vertex the connection originates from
+        :param to: vertex the connection points to
+        """
 
-        return latest_edges_set
+        self.incoming_edges.setdefault(to, set()).add(frm)
 
     def _generateTimestamp(self):
         """
-        Generate current epoch time in microseconds.
+        Generate current epoch time in microseconds. Timestamps generated by the graph are strictly
+        increasing: if the clock has not moved on since the previous timestamp, or went backwards,
+        the previous timestamp incremented by one is returned instead. Callers must hold the lock.
 
         :return: epoch time
         """
 
-        return int(time.time() * 1000000)
+        timestamp = time.time_ns() // 1000
+
+        if timestamp <= self.last_timestamp:
+            timestamp = self.last_timestamp + 1
+
+        self.last_timestamp = timestamp
+
+        return timestamp
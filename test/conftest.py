@@ -1,12 +1,73 @@
 import pytest
+from main import lww_directed_graph
 from main.lww_directed_graph import Graph
 
+from .fake_clock import FakeClock
+
+CONNECTIONS = ((1, 2), (1, 3), (2, 5), (3, 5), (5, 7), (4, 6))
+
+GRAPH_ATTRIBUTES = {
+    "vertices_added_set",
+    "vertices_removed_set",
+    "edges_added_set",
+    "edges_removed_set",
+    "incoming_edges",
+    "connected_vertices_cache",
+    "last_timestamp",
+    "lock",
+}
+
 
 @pytest.fixture(scope="function")
-def graph():
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(lww_directed_graph, "time", fake_clock)
+    return fake_clock
+
+
+def _clear_graph(graph):
+    """Empty a graph in place, including its indexes, caches and last generated timestamp"""
+    # fails when Graph gains an attribute which is not reset here, so its state cannot leak between tests
+    assert set(vars(graph)) == GRAPH_ATTRIBUTES
+
+    for graph_set in (
+        graph.vertices_added_set,
+        graph.vertices_removed_set,
+        graph.edges_added_set,
+        graph.edges_removed_set,
+        graph.incoming_edges,
+        graph.connected_vertices_cache,
+    ):
+        graph_set.clear()
+
+    graph.last_timestamp = 0
+
+    return graph
+
+
+@pytest.fixture(scope="module")
+def _module_graph():
     return Graph()
 
 
-@pytest.fixture(scope="function")
-def replica_graph():
+@pytest.fixture(scope="module")
+def _module_replica_graph():
     return Graph()
+
+
+@pytest.fixture(scope="function")
+def graph(_module_graph):
+    return _clear_graph(_module_graph)
+
+
+@pytest.fixture(scope="function")
+def replica_graph(_module_replica_graph):
+    return _clear_graph(_module_replica_graph)
+
+
+@pytest.fixture(scope="function")
+def built_graph(graph):
+    for frm, to in CONNECTIONS:
+        graph.addEdge(frm, to)
+
+    return graph
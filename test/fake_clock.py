@@ -0,0 +1,11 @@
+class FakeClock:
+    """Stand-in for the time module used by the graph, which only moves forward when ticked"""
+
+    def __init__(self):
+        self.now_ns = 1600000000 * 10**9
+
+    def time_ns(self):
+        return self.now_ns
+
+    def tick(self):
+        self.now_ns += 10**9
@@ -1,5 +1,27 @@
-from datetime import datetime
-from time import sleep
+from copy import deepcopy
+from unittest.mock import patch
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from main import lww_directed_graph
+from main.lww_directed_graph import Graph
+
+from .fake_clock import FakeClock
+
+# epoch times in microseconds, roughly years 2001 and 5138
+MIN_US = 10**15
+MAX_US = 10**17
+
+
+def _is_valid_us_timestamp(ts):
+    """Check the timestamp is an integer epoch time in microseconds between MIN_US and MAX_US"""
+    return isinstance(ts, int) and MIN_US < ts < MAX_US
+
+
+def _path_set(paths):
+    """Paths returned by findPaths as a set of tuples, to compare them regardless of their order"""
+    return {tuple(path) for path in paths}
 
 
 def test_addVertex(graph):
@@ -10,8 +32,20 @@ def test_addVertex(graph):
 
     ts = graph.vertices_added_set.get(vertex)
 
-    assert vertex in graph.vertices_added_set.keys()
-    assert isinstance(datetime.fromtimestamp(ts / 1000000), datetime)
+    assert vertex in graph.vertices_added_set
+    assert _is_valid_us_timestamp(ts)
+
+
+def test_addVertex_timestamps_increase(graph):
+    """Test to validate timestamps of consecutive operations are strictly increasing"""
+    vertices = range(100)
+
+    for vertex in vertices:
+        graph.addVertex(vertex)
+
+    timestamps = [graph.vertices_added_set[vertex] for vertex in vertices]
+
+    assert all(ts1 < ts2 for ts1, ts2 in zip(timestamps, timestamps[1:]))
 
 
 def test_addEdge(graph):
@@ -25,19 +59,34 @@ def test_addEdge(graph):
 
     graph.addEdge(connection[0], connection[1])
 
-    e_ts = graph.edges_added_set.get(connection[0], {}).get(connection[1])
+    edges = graph.edges_added_set.get(connection[0], {})
+
+    e_ts = edges.get(connection[1])
     v1_ts = graph.vertices_added_set.get(connection[0])
     v2_ts = graph.vertices_added_set.get(connection[1])
 
-    assert connection[1] in graph.edges_added_set.get(connection[0], {}).keys()
-    assert isinstance(datetime.fromtimestamp(e_ts / 1000000), datetime)
+    assert connection[1] in edges
+    assert _is_valid_us_timestamp(e_ts)
 
-    assert connection[0] in graph.vertices_added_set.keys()
-    assert connection[1] in graph.vertices_added_set.keys()
+    assert connection[0] in graph.vertices_added_set
+    assert connection[1] in graph.vertices_added_set
 
     assert e_ts == v1_ts == v2_ts
 
 
+def test_addEdge_removed_vertex(graph):
+    """
+    Test to validate a removed vertex is added back to the graph when an edge referencing it is added
+    """
+    graph.addVertex(1)
+    graph.removeVertex(1)
+
+    graph.addEdge(1, 2)
+
+    assert graph.lookupVertexExists(1) is True
+    assert graph.vertices_added_set[1] == graph.edges_added_set[1][2]
+
+
 def test_removeVertex(graph):
     """
     Test to validate:
@@ -53,13 +102,17 @@ def test_removeVertex(graph):
 
     graph.removeVertex(vertex_to_remove)
 
-    assert graph.vertices_removed_set.get(
-        vertex_to_remove
-    ) > graph.vertices_added_set.get(vertex_to_remove)
+    va, vr, er = (
+        graph.vertices_added_set,
+        graph.vertices_removed_set,
+        graph.edges_removed_set,
+    )
 
-    assert vertex_to_remove in graph.edges_removed_set.keys()
-    assert connected_vertex1 in graph.edges_removed_set.get(vertex_to_remove, {}).keys()
-    assert vertex_to_remove in graph.edges_removed_set.get(connected_vertex2, {}).keys()
+    assert vr[vertex_to_remove] > va[vertex_to_remove]
+
+    assert vertex_to_remove in er
+    assert connected_vertex1 in er.get(vertex_to_remove, {})
+    assert vertex_to_remove in er.get(connected_vertex2, {})
 
 
 def test_removeEdge(graph):
@@ -72,9 +125,11 @@ def test_removeEdge(graph):
 
     graph.removeEdge(connection[0], connection[1])
 
-    assert graph.edges_removed_set.get(connection[0], {}).get(
-        connection[1]
-    ) > graph.edges_added_set.get(connection[0], {}).get(connection[1])
+    added_edges = graph.edges_added_set.get(connection[0], {})
+    removed_edges = graph.edges_removed_set.get(connection[0], {})
+
+    assert connection[1] in removed_edges
+    assert removed_edges[connection[1]] > added_edges[connection[1]]
 
 
 def test_lookupVertexExists(graph):
@@ -83,6 +138,7 @@ def test_lookupVertexExists(graph):
     * method returns True if vertex is in the added_set
     * method returns False if vertex is in the removed_set with a greater timestamp than the added_set
     * method returns True when the vertex is re-added to the graph which updates its timestamp in the added_set
+    * method returns True for a vertex added with a negative timestamp and never removed
     """
     vertex = 1
 
@@ -100,6 +156,15 @@ def test_lookupVertexExists(graph):
     non_existent_vertex = 2
     assert graph.lookupVertexExists(non_existent_vertex) is False
 
+    # vertex added with an explicit timestamp below -1 and never removed
+    negative_vertex = 3
+    graph.addVertex(negative_vertex, -5)
+    assert graph.lookupVertexExists(negative_vertex) is True
+
+    # adding an edge keeps the timestamp of the existing vertex
+    graph.addEdge(negative_vertex, vertex)
+    assert graph.vertices_added_set[negative_vertex] == -5
+
 
 def test_lookupConnectedVertices(graph):
     """
@@ -126,80 +191,279 @@ def test_lookupConnectedVertices(graph):
     assert graph.lookupConnectedVertices(non_existent_vertex) == []
 
 
-def test_findPaths(graph):
+def test_lookupConnectedVertices_cache(graph, replica_graph):
+    """
+    Test to validate cached connected vertices are updated when an edge is added, removed or merged
+    """
+    graph.addEdge(1, 2)
+    assert graph.lookupConnectedVertices(1) == [2]
+
+    graph.addEdge(1, 3)
+    assert graph.lookupConnectedVertices(1) == [2, 3]
+
+    graph.removeVertex(2)
+    assert graph.lookupConnectedVertices(1) == [3]
+
+    replica_graph.addEdge(1, 4)
+    graph.merge(
+        replica_graph.vertices_added_set,
+        replica_graph.vertices_removed_set,
+        replica_graph.edges_added_set,
+        replica_graph.edges_removed_set,
+    )
+    assert graph.lookupConnectedVertices(1) == [3, 4]
+
+    # returned list does not modify the cached connections
+    graph.lookupConnectedVertices(1).append(5)
+    assert graph.lookupConnectedVertices(1) == [3, 4]
+
+
+@pytest.mark.parametrize(
+    "vertex1, vertex2, expected",
+    [
+        (1, 3, {(1, 3)}),
+        (1, 5, {(1, 2, 5), (1, 3, 5)}),
+        (1, 7, {(1, 2, 5, 7), (1, 3, 5, 7)}),
+        (1, 6, set()),
+        (8, 9, set()),
+        (5, 1, set()),
+    ],
+)
+def test_findPaths(built_graph, vertex1, vertex2, expected):
     """
     Test to validate all possible paths are returned between vertices and an empty list is returned
     if no paths are available between the vertices or the vertices do not exist in the graph.
+    The order of the paths is unspecified.
+    """
+    paths = built_graph.findPaths(vertex1, vertex2)
+
+    assert _path_set(paths) == expected
+    assert len(paths) == len(expected)
+
+
+LAYERS = 8
+LAYER_WIDTH = 3
+
+
+def _build_layered_graph(graph):
     """
-    connections = [[1, 2], [1, 3], [2, 5], [3, 5], [5, 7], [4, 6]]
+    Connect a source vertex to a sink through LAYERS layers of LAYER_WIDTH vertices, where each vertex
+    is connected to every vertex in the next layer
+    """
+    layers = [[(layer, i) for i in range(LAYER_WIDTH)] for layer in range(LAYERS)]
 
-    for connection in connections:
-        graph.addEdge(connection[0], connection[1])
+    for vertex in layers[0]:
+        graph.addEdge("source", vertex)
 
-    paths = graph.findPaths(1, 3)
-    assert paths == [[1, 3]]
+    for layer, next_layer in zip(layers, layers[1:]):
+        for vertex in layer:
+            for connection in next_layer:
+                graph.addEdge(vertex, connection)
 
-    paths = graph.findPaths(1, 5)
-    assert paths == [[1, 2, 5], [1, 3, 5]]
+    for vertex in layers[-1]:
+        graph.addEdge(vertex, "sink")
 
-    paths = graph.findPaths(1, 7)
-    assert paths == [[1, 2, 5, 7], [1, 3, 5, 7]]
+    return graph
 
-    paths = graph.findPaths(1, 6)
-    assert paths == []
 
-    paths = graph.findPaths(8, 9)
-    assert paths == []
+def test_findPaths_layered(graph):
+    """Test to validate every path through a layered graph is found"""
+    paths = _build_layered_graph(graph).findPaths("source", "sink")
 
-    paths = graph.findPaths(5, 1)
-    assert paths == []
+    assert len(paths) == LAYER_WIDTH**LAYERS
+    assert len(_path_set(paths)) == len(paths)
 
 
-def test_merge(graph, replica_graph):
+@pytest.mark.benchmark(group="findPaths")
+def test_findPaths_scaling(graph, benchmark):
     """
-    Test to validate local vertices/edges are merged with vertices/edges from other replicas.
-    No overlapping vertices/edges.
+    Test to validate all paths through a layered graph are found within 0.1s on average.
+    Only runs with --benchmark-only, and the time is not checked when benchmarking is disabled.
+    The path count is checked by test_findPaths_layered.
     """
-    local_connections = [[1, 2], [2, 5]]
-    replica_connections = [[3, 5]]
-    removed_local_vertex = 1
-    removed_replica_vertex = 3
+    benchmark(_build_layered_graph(graph).findPaths, "source", "sink")
 
-    for connection in local_connections:
-        graph.addEdge(connection[0], connection[1])
+    if not benchmark.disabled:
+        assert benchmark.stats["mean"] < 0.1
 
-    for connection in replica_connections:
-        replica_graph.addEdge(connection[0], connection[1])
 
-    graph.removeVertex(removed_local_vertex)
-    replica_graph.removeVertex(removed_replica_vertex)
+def test_findAnyPath(graph):
+    """
+    Test to validate the path with the fewest edges is returned between vertices and an empty list is
+    returned if no path is available between the vertices or the vertices do not exist in the graph.
+    """
+    connections = ((1, 2), (2, 5), (1, 3), (3, 4), (4, 5), (5, 7), (4, 6))
 
-    graph.merge(
-        replica_graph.vertices_added_set,
-        replica_graph.vertices_removed_set,
-        replica_graph.edges_added_set,
-        replica_graph.edges_removed_set,
-    )
+    for frm, to in connections:
+        graph.addEdge(frm, to)
 
-    assert graph.vertices_added_set.keys() == {1, 2, 3, 5}
-    assert graph.vertices_removed_set.keys() == {1, 3}
+    assert graph.findAnyPath(1, 5) == [1, 2, 5]
+    assert graph.findAnyPath(1, 7) == [1, 2, 5, 7]
+    assert graph.findAnyPath(1, 1) == [1]
+    assert graph.findAnyPath(6, 1) == []
+    assert graph.findAnyPath(8, 9) == []
 
-    assert graph.edges_added_set.keys() == {1, 2, 3}
-    assert graph.edges_removed_set.keys() == {1, 3}
+    graph.removeEdge(2, 5)
+    assert graph.findAnyPath(1, 5) == [1, 3, 4, 5]
 
 
-def test_merge2(graph, replica_graph):
+def test_findPaths_cycle(graph):
+    """
+    Test to validate vertices already on a path are not revisited when the graph contains a cycle
+    """
+    connections = ((1, 2), (2, 1), (2, 3), (3, 1))
+
+    for frm, to in connections:
+        graph.addEdge(frm, to)
+
+    assert graph.findPaths(1, 3) == [[1, 2, 3]]
+    assert graph.findPaths(3, 2) == [[3, 1, 2]]
+
+
+MERGE_CASES = [
+    pytest.param(
+        [
+            ("local", "addEdge", 1, 2),
+            ("local", "addEdge", 2, 5),
+            ("replica", "addEdge", 3, 5),
+            ("local", "removeVertex", 1),
+            ("replica", "removeVertex", 3),
+        ],
+        {
+            "keys": {
+                "vertices_added_set": {1, 2, 3, 5},
+                "vertices_removed_set": {1, 3},
+                "edges_added_set": {1, 2, 3},
+                "edges_removed_set": {1, 3},
+            },
+        },
+        id="merge",
+    ),
+    pytest.param(
+        [
+            ("local", "addEdge", 1, 2),
+            ("tick",),
+            ("replica", "addEdge", 1, 2),
+            ("tick",),
+            ("replica", "removeEdge", 1, 2),
+        ],
+        {
+            "timestamps": {("edges_added_set", 1, 2): "replica"},
+            "copied": ["edges_removed_set"],
+            "lookupConnectedVertices": {1: []},
+        },
+        id="merge2",
+    ),
+    pytest.param(
+        [
+            ("replica", "addVertex", 1),
+            ("tick",),
+            ("local", "addVertex", 1),
+            ("tick",),
+            ("replica", "removeVertex", 1),
+        ],
+        {
+            "timestamps": {("vertices_added_set", 1): "local"},
+            "copied": ["vertices_removed_set"],
+            "lookupVertexExists": {1: False},
+        },
+        id="merge3",
+    ),
+    pytest.param(
+        [
+            ("replica", "addEdge", 1, 2),
+            ("tick",),
+            ("replica", "removeEdge", 1, 2),
+            ("tick",),
+            ("local", "addEdge", 1, 2),
+        ],
+        {
+            "timestamps": {("edges_added_set", 1, 2): "local"},
+            "copied": ["edges_removed_set"],
+            "lookupConnectedVertices": {1: [2]},
+        },
+        id="merge4",
+    ),
+    pytest.param(
+        [
+            ("replica", "addVertex", 1),
+            ("tick",),
+            ("replica", "removeVertex", 1),
+            ("tick",),
+            ("local", "addVertex", 1),
+        ],
+        {
+            "timestamps": {("vertices_added_set", 1): "local"},
+            "copied": ["vertices_removed_set"],
+            "lookupVertexExists": {1: True},
+        },
+        id="merge5",
+    ),
+    pytest.param(
+        [
+            ("local", "addEdge", 1, 2),
+            ("replica", "addEdge", 1, 3),
+        ],
+        {
+            "lookupConnectedVertices": {1: [2, 3]},
+        },
+        id="merge6",
+    ),
+    pytest.param(
+        [
+            ("local", "removeEdge", 1, 3, -2),
+            ("replica", "addVertex", 1, -5),
+            ("replica", "removeEdge", 1, 2, -3),
+        ],
+        {
+            "keys": {"vertices_added_set": {1}, "edges_removed_set": {1}},
+            "timestamps": {
+                ("vertices_added_set", 1): "replica",
+                ("edges_removed_set", 1, 2): "replica",
+                ("edges_removed_set", 1, 3): "local",
+            },
+        },
+        id="merge_explicit_timestamps",
+    ),
+]
+
+
+def _graph_state(graph):
+    """Copy of the vertices/edges sets of a graph, keyed by the name of the set"""
+    return {
+        name: deepcopy(getattr(graph, name))
+        for name in (
+            "vertices_added_set",
+            "vertices_removed_set",
+            "edges_added_set",
+            "edges_removed_set",
+        )
+    }
+
+
+@pytest.mark.merge
+@pytest.mark.parametrize("script, expected", MERGE_CASES)
+def test_merge(graph, replica_graph, clock, script, expected):
     """
     Test to validate local vertices/edges are merged with vertices/edges from other replicas.
-    Edge deleted in the replica with greater timestamp.
+    Each case runs a script of operations on the local graph and the replica, ticking the clock
+    where the order of operations matters, merges the replica into the local graph and validates:
+    * keys: keys of the local sets
+    * timestamps: whether the local or the replica's timestamp of a vertex/edge is kept
+    * copied: local sets which are equal to the replica's sets
+    * lookupVertexExists/lookupConnectedVertices: results of the lookups in the local graph
+    * the replica's sets are not modified by the merge
     """
-    connection = [1, 2]
+    graphs = {"local": graph, "replica": replica_graph}
 
-    graph.addEdge(connection[0], connection[1])
-    sleep(1)
-    replica_graph.addEdge(connection[0], connection[1])
-    sleep(1)
-    replica_graph.removeEdge(connection[0], connection[1])
+    for actor, *operation in script:
+        if actor == "tick":
+            clock.tick()
+        else:
+            method, *args = operation
+            getattr(graphs[actor], method)(*args)
+
+    states = {actor: _graph_state(g) for actor, g in graphs.items()}
 
     graph.merge(
         replica_graph.vertices_added_set,
@@ -208,26 +472,36 @@ def test_merge2(graph, replica_graph):
         replica_graph.edges_removed_set,
     )
 
-    # check timestamp is updated for matching keys
-    assert graph.edges_added_set[1][2] == replica_graph.edges_added_set[1][2]
-    # check removed_set copied
-    assert graph.edges_removed_set == replica_graph.edges_removed_set
-    # validate edge does not exists in local graph
-    assert graph.lookupConnectedVertices(connection[0]) == []
+    if "keys" in expected:
+        # single comparison, so a failure shows the keys of every set at once
+        keys = {name: set(getattr(graph, name)) for name in expected["keys"]}
+        assert keys == expected["keys"]
+
+    for (name, *path), actor in expected.get("timestamps", {}).items():
+        merged, kept = getattr(graph, name), states[actor][name]
+        for key in path:
+            merged, kept = merged[key], kept[key]
+        assert merged == kept
+
+    for name in expected.get("copied", []):
+        assert getattr(graph, name) == states["replica"][name]
+
+    for vertex, exists in expected.get("lookupVertexExists", {}).items():
+        assert graph.lookupVertexExists(vertex) is exists
+
+    for vertex, connected in expected.get("lookupConnectedVertices", {}).items():
+        assert graph.lookupConnectedVertices(vertex) == connected
 
+    assert _graph_state(replica_graph) == states["replica"]
 
-def test_merge3(graph, replica_graph):
+
+@pytest.mark.merge
+def test_removeVertex_merged_edge(graph, replica_graph):
     """
-    Test to validate local vertices/edges are merged with vertices/edges from other replicas.
-    Vertex deleted in the replica with greater timestamp.
+    Test to validate an edge received from a replica and pointing to a vertex is removed
+    when the vertex is removed from the local graph.
     """
-    vertex = 1
-
-    replica_graph.addVertex(vertex)
-    sleep(1)
-    graph.addVertex(vertex)
-    sleep(1)
-    replica_graph.removeVertex(vertex)
+    replica_graph.addEdge(1, 2)
 
     graph.merge(
         replica_graph.vertices_added_set,
@@ -235,66 +509,121 @@ def test_merge3(graph, replica_graph):
         replica_graph.edges_added_set,
         replica_graph.edges_removed_set,
     )
+    assert graph.incoming_edges == {2: {1}}
 
-    # check added_vertex_set ts is kept as is
-    assert graph.vertices_added_set[vertex] > replica_graph.vertices_added_set[vertex]
-    # check removed_vertex_set is copied
-    assert graph.vertices_removed_set == replica_graph.vertices_removed_set
-    # validate vertex does not exists in local graph
-    assert graph.lookupVertexExists(vertex) is False
+    graph.removeVertex(2)
 
+    assert 2 in graph.edges_removed_set.get(1, {})
+    assert graph.lookupConnectedVertices(1) == []
 
-def test_merge4(graph, replica_graph):
+
+VERTEX_IDS = range(1, 11)
+
+VERTICES = st.sampled_from(VERTEX_IDS)
+
+
+def _script(replicas):
     """
-    Test to validate local vertices/edges are merged with vertices/edges from other replicas.
-    Edge deleted in the replica with lesser timestamp.
+    Strategy for a script of operations interleaved across the replicas, with ("tick",) moving the
+    shared clock forward. Replicas acting between two ticks generate the same timestamps, so concurrent
+    and tied operations on different replicas occur.
     """
-    connection = [1, 2]
+    actors = st.integers(0, replicas - 1)
+
+    return st.lists(
+        st.one_of(
+            st.tuples(st.just("tick")),
+            st.tuples(actors, st.just("addVertex"), VERTICES),
+            st.tuples(actors, st.just("addEdge"), VERTICES, VERTICES),
+            st.tuples(actors, st.just("removeVertex"), VERTICES),
+            st.tuples(actors, st.just("removeEdge"), VERTICES, VERTICES),
+        ),
+        max_size=40,
+    )
 
-    replica_graph.addEdge(connection[0], connection[1])
-    sleep(1)
-    replica_graph.removeEdge(connection[0], connection[1])
-    sleep(1)
-    graph.addEdge(connection[0], connection[1])
 
-    graph.merge(
-        replica_graph.vertices_added_set,
-        replica_graph.vertices_removed_set,
-        replica_graph.edges_added_set,
-        replica_graph.edges_removed_set,
-    )
+def _build_graphs(replicas, script):
+    """Graphs of the replicas built by applying a script of operations with a new fake clock"""
+    graphs = [Graph() for _ in range(replicas)]
+    fake_clock = FakeClock()
 
-    # check timestamp of local graph is not updated with timestamp from replica
-    assert graph.edges_added_set[1][2] != replica_graph.edges_added_set[1][2]
-    # check removed_set copied
-    assert graph.edges_removed_set == replica_graph.edges_removed_set
-    # validate edge exists in local graph
-    assert graph.lookupConnectedVertices(connection[0]) == [connection[1]]
+    with patch.object(lww_directed_graph, "time", fake_clock):
+        for actor, *operation in script:
+            if actor == "tick":
+                fake_clock.tick()
+            else:
+                method, *args = operation
+                getattr(graphs[actor], method)(*args)
 
+    return graphs
 
-def test_merge5(graph, replica_graph):
+
+def _merged_graph(*graphs):
+    """Empty graph merged with the state of each graph, in the given order"""
+    merged = Graph()
+
+    for graph in graphs:
+        merged.merge(
+            graph.vertices_added_set,
+            graph.vertices_removed_set,
+            graph.edges_added_set,
+            graph.edges_removed_set,
+        )
+
+    return merged
+
+
+def _lookups(graph):
+    """Results of the lookups of every vertex, with the connected vertices as sets"""
+    return {
+        vertex: (
+            graph.lookupVertexExists(vertex),
+            set(graph.lookupConnectedVertices(vertex)),
+        )
+        for vertex in VERTEX_IDS
+    }
+
+
+@pytest.mark.merge
+@settings(max_examples=100, deadline=None)
+@given(script=_script(2))
+def test_merge_commutative_idempotent(script):
     """
-    Test to validate local vertices/edges are merged with vertices/edges from other replicas.
-    Vertex deleted in the replica with lesser timestamp.
+    Test to validate merging is commutative and idempotent for random concurrent operations on two replicas:
+    * merging a replica into an empty graph results in the replica's state and lookups
+    * merging the replicas in either order results in the same state and lookups
+    * merging a replica again does not change the state
     """
-    vertex = 1
+    graph_a, graph_b = _build_graphs(2, script)
 
-    replica_graph.addVertex(vertex)
-    sleep(1)
-    replica_graph.removeVertex(vertex)
-    sleep(1)
-    graph.addVertex(vertex)
+    merged_a = _merged_graph(graph_a)
 
-    graph.merge(
-        replica_graph.vertices_added_set,
-        replica_graph.vertices_removed_set,
-        replica_graph.edges_added_set,
-        replica_graph.edges_removed_set,
-    )
+    assert _graph_state(merged_a) == _graph_state(graph_a)
+    assert _lookups(merged_a) == _lookups(graph_a)
 
-    # check added_vertex_set ts is kept as is
-    assert graph.vertices_added_set[vertex] > replica_graph.vertices_added_set[vertex]
-    # check removed_vertex_set is copied
-    assert graph.vertices_removed_set == replica_graph.vertices_removed_set
-    # validate vertex exists in local graph
-    assert graph.lookupVertexExists(vertex) is True
+    merged_ab = _merged_graph(graph_a, graph_b)
+    merged_ba = _merged_graph(graph_b, graph_a)
+
+    assert _graph_state(merged_ab) == _graph_state(merged_ba)
+    assert _lookups(merged_ab) == _lookups(merged_ba)
+
+    merged_abb = _merged_graph(graph_a, graph_b, graph_b)
+
+    assert _graph_state(merged_abb) == _graph_state(merged_ab)
+
+
+@pytest.mark.merge
+@settings(max_examples=100, deadline=None)
+@given(script=_script(3))
+def test_merge_associative(script):
+    """
+    Test to validate merging is associative for random concurrent operations on three replicas:
+    merging a with the merge of b and c results in the same state as merging the merge of a and b with c
+    """
+    graph_a, graph_b, graph_c = _build_graphs(3, script)
+
+    merged_a_bc = _merged_graph(graph_a, _merged_graph(graph_b, graph_c))
+    merged_ab_c = _merged_graph(_merged_graph(graph_a, graph_b), graph_c)
+
+    assert _graph_state(merged_a_bc) == _graph_state(merged_ab_c)
+    assert _lookups(merged_a_bc) == _lookups(merged_ab_c)